@@ -0,0 +1,74 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+import fire
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+# 冷启动时不应被导入的翻译后端 SDK
+FORBIDDEN_MODULES = ("openai", "google.genai")
+
+# python -X importtime 输出格式: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_once(module: str) -> tuple[float, set[str]]:
+    """Import `module` in a fresh interpreter and return (cumulative ms, all imported modules)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        # 只统计顶层（无缩进）的目标模块
+        if match.group(4) == module and match.group(3) == " ":
+            cumulative_us = int(match.group(2))
+    if cumulative_us is None:
+        raise RuntimeError(f"无法从 -X importtime 输出中找到模块 {module}")
+    return cumulative_us / 1000, imported
+
+
+def main(module: str = "agent", runs: int = 5, threshold_ms: float = 200) -> None:
+    """Benchmark the cold-start import time of the CLI and fail on regressions.
+
+    Args:
+        module: The module to import, relative to src/
+        runs: Number of fresh interpreters to measure
+        threshold_ms: Fail if the median cumulative import time exceeds this
+    """
+    timings = []
+    leaked = set()
+    for _ in range(runs):
+        elapsed_ms, imported = measure_once(module)
+        timings.append(elapsed_ms)
+        leaked |= {name for name in imported if name in FORBIDDEN_MODULES}
+
+    median_ms = statistics.median(timings)
+    print(
+        f"import {module}: median {median_ms:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms "
+        f"({runs} runs, threshold {threshold_ms:.0f} ms)"
+    )
+    failed = False
+    if leaked:
+        print(f"❌ 冷启动时导入了翻译后端 SDK: {', '.join(sorted(leaked))}")
+        failed = True
+    if median_ms > threshold_ms:
+        print(f"❌ 冷启动导入耗时 {median_ms:.1f} ms 超过阈值 {threshold_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ 冷启动导入耗时在阈值内")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
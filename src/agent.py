@@ -1,64 +1,174 @@
+import contextvars
 import os
 import re
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple
 
 import fire
 
-from translate_by_deepseek import generate_in_non_stream_mode as translate_by_deepseek
+from backends import BACKENDS, PRICING, get_backend
+from prompts import DEFAULT_TARGET, build_system_prompt, parse_targets
+from retry_with_backoff import CircuitOpenError, DeadlineExceededError, deadline_scope
+from tracing import now_us as trace_now_us
+from tracing import record_span, span, traced, tracing
 
 # --- 配置项 ---
 MAX_CHUNK_SIZE = 100000
+# 粗略估算: 英文约 4 个字符 1 个 Token；三步翻译法的输出（初译、反思、润色）约为输入的 3 倍
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_RATIO = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
 
 
 class TranslateAgent:
     """
-    TranslateAgent is a class that translates a Markdown file into a bilingual format.
+    TranslateAgent is a class that translates a Markdown file into one or more target languages.
+
+    Args:
+        provider: The translation backend to use.
+        fallback_provider: The backend to switch to when `provider` is unhealthy or out of time budget.
+        job_timeout: Time budget in seconds for the whole run, None for unlimited.
+        call_timeout: Time budget in seconds for each translation call (including retries), None for unlimited.
+        max_workers: Number of translation calls to run concurrently.
     """
 
-    def run(self, file_path: str, keep_original: bool = False, output_path: str = None) -> None:
+    def __init__(
+        self,
+        provider: str = "deepseek",
+        fallback_provider: str | None = None,
+        job_timeout: float | None = None,
+        call_timeout: float | None = None,
+        max_workers: int = 4,
+    ):
+        for name in (provider, fallback_provider):
+            if name is not None and name not in BACKENDS:
+                raise ValueError(f"未知的翻译后端: {name}，可选: {', '.join(BACKENDS)}")
+        self.provider = provider
+        self.fallback_provider = fallback_provider
+        self.job_timeout = job_timeout
+        self.call_timeout = call_timeout
+        self.max_workers = max_workers
+
+    def run(
+        self,
+        file_path: str,
+        keep_original: bool = False,
+        output_path: str = None,
+        targets=DEFAULT_TARGET,
+        trace: str = None,
+        dry_run: bool = False,
+    ) -> None:
+        # trace: 将本次运行的时间线以 Chrome trace-event 格式写入该文件（可在 Perfetto 中打开）
+        # dry_run: 只切分并估算 Token 与费用，不调用（也不导入）任何翻译后端
+        with tracing(trace), deadline_scope(self.job_timeout):
+            self._run(file_path, keep_original=keep_original, output_path=output_path, targets=targets, dry_run=dry_run)
+
+    def _run(
+        self,
+        file_path: str,
+        keep_original: bool = False,
+        output_path: str = None,
+        targets=DEFAULT_TARGET,
+        dry_run: bool = False,
+    ) -> None:
         try:
-            with open(file_path, encoding="utf-8") as f:
+            targets = parse_targets(targets)
+        except ValueError as e:
+            print(f"❌ 错误: {e}")
+            return
+        output_paths = self.resolve_output_paths(file_path, output_path, targets)
+        if output_paths is None:
+            print(
+                "❌ 错误: 输出文件冲突，多个目标语言不能共用同一输出文件（可在 output_path 中使用 {target} 占位符），"
+                f"输出文件也不能与输入文件相同: {output_path or file_path}"
+            )
+            return
+        try:
+            with span("read_file", cat="io", path=file_path), open(file_path, encoding="utf-8") as f:
                 markdown_content = f.read()
         except FileNotFoundError:
             print(f"❌ 错误: 输入文件 {file_path} 不存在。")
             return
-        if not output_path:
-            output_path = file_path.replace(".md", "_zh_CN.md")
-        print(f"✅ 开始翻译任务: {file_path} -> {output_path}")
+        print(f"✅ 开始翻译任务: {file_path} -> {', '.join(output_paths.values())}")
 
         # 1. 按标题将文章分割成语义块
         sections = self.split_into_sections_by_headings(markdown_content)
         total_sections = len(sections)
         print(f"✅ 文章已按标题分割成 {total_sections} 个主要部分。")
 
-        # 2. 遍历每个部分进行处理
-        final_bilingual_parts = []
+        # 2. 遍历每个部分，分离特殊内容（代码块、表格、图片）并检查超长块，所有目标语言共用一次切分结果
+        segmented_sections = []
         for i, (heading, section_content) in enumerate(sections):
             print(
                 f"🚧 正在处理 [{i + 1}/{total_sections}] 部分: \n 标题: {heading.strip() if heading else 'Preamble'}\n 内容: {section_content[:256]} ..."
             )
-
-            # 翻译部分内容（此函数内部会处理代码块、表格、链接、图片、超长块）
             original_part = f"{heading}{section_content}"
-            translated_section_content = self.process_and_translate_text_chunk(original_part)
+            segmented_sections.append(self.segment_text_chunk(original_part))
 
-            # 3. 组合成中英交替格式
-            # final_bilingual_parts.append(original_part.strip())
-            final_bilingual_parts.append(translated_section_content.strip())
+        # 3. 去重后将 文本块 × 目标语言 的翻译任务并发分发到线程池
+        unique_chunks = list(
+            dict.fromkeys(part for parts in segmented_sections for is_special, part in parts if not is_special)
+        )
+        if dry_run:
+            self.report_dry_run(segmented_sections, unique_chunks, targets)
+            return
+        translations = self.translate_many(unique_chunks, targets)
 
-        # 4. 写入输出文件
-        final_content = "\n\n".join(final_bilingual_parts)
-        try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(final_content)
-            print(f"\n🎉 翻译完成！结果已保存至: {output_path}")
-            if not keep_original:
-                os.remove(file_path)
-        except OSError as e:
-            print(f"❌ 错误: 无法写入文件 at {output_path}. Error: {e}")
+        # 4. 按目标语言组装并写入输出文件
+        all_written = True
+        for target, target_output_path in output_paths.items():
+            final_content = "\n\n".join(
+                self.assemble_text_chunk(parts, lambda part, target=target: translations[(target, part)]).strip()
+                for parts in segmented_sections
+            )
+            try:
+                with (
+                    span("write_output", cat="io", target=target, path=target_output_path),
+                    open(target_output_path, "w", encoding="utf-8") as f,
+                ):
+                    f.write(final_content)
+                print(f"\n🎉 翻译完成！结果已保存至: {target_output_path}")
+            except OSError as e:
+                all_written = False
+                print(f"❌ 错误: 无法写入文件 at {target_output_path}. Error: {e}")
+        if all_written and not keep_original:
+            os.remove(file_path)
 
     @staticmethod
+    def resolve_output_paths(file_path: str, output_path: str | None, targets: list[str]) -> dict[str, str] | None:
+        """Map each target language to its output file.
+
+        Args:
+            file_path: The source Markdown file
+            output_path: An explicit output file, may contain a {target} placeholder
+            targets: The target language codes
+
+        Returns:
+            The output path per target, or None if two targets would share one output file
+            or an output file would overwrite the source
+        """
+        if not output_path:
+            # 只在文件名上追加语言后缀，不改动目录名
+            directory, filename = os.path.split(file_path)
+            stem, ext = os.path.splitext(filename)
+            output_paths = {target: os.path.join(directory, f"{stem}_{target}{ext}") for target in targets}
+        elif "{target}" in output_path:
+            output_paths = {target: output_path.replace("{target}", target) for target in targets}
+        else:
+            output_paths = {target: output_path for target in targets}
+
+        resolved = [os.path.abspath(path) for path in output_paths.values()]
+        if len(set(resolved)) < len(resolved) or os.path.abspath(file_path) in resolved:
+            return None
+        return output_paths
+
+    @staticmethod
+    @traced("split_into_sections_by_headings", cat="parse")
     def split_into_sections_by_headings(markdown_content: str) -> List[Tuple[str, str]]:
         if not markdown_content.strip():
             return []
@@ -79,15 +189,16 @@ class TranslateAgent:
 
         return sections
 
-    def process_and_translate_text_chunk(self, text_chunk: str) -> str:
+    def segment_text_chunk(self, text_chunk: str) -> List[Tuple[bool, str]]:
+        """Split a text chunk into (is_special_content, part) pairs, dropping blank parts."""
         if not text_chunk.strip():
-            return ""
+            return []
 
         # 1. 分离出不需要翻译的内容
         parts = self.split_by_special_content(text_chunk)
         print(f"✅ 文本块已按特殊内容分割成 {len(parts)} 个部分。")
 
-        translated_parts = []
+        segments = []
         for part in parts:
             if not part.strip():
                 continue
@@ -98,25 +209,30 @@ class TranslateAgent:
                 or part.startswith("|")  # 表格
                 or part.startswith("![")  # 图片
             )
-            if is_special_content:
-                # 特殊内容原样保留
-                translated_parts.append(f"\n{part}\n")
-                continue
-
-            # 对于普通文本部分，进行大小检查和递归处理
-            if len(part) <= MAX_CHUNK_SIZE:
-                # 小于限制，直接翻译
-                translated_parts.append(self.translate(part))
-            else:
+            # 对于普通文本部分，进行大小检查
+            if not is_special_content and len(part) > MAX_CHUNK_SIZE:
                 # 块太大，需要进一步分割
                 print(
                     f"  - [递归分割] 块大小为 {len(part)} 字符，超过限制（{MAX_CHUNK_SIZE} 个字符），需要进一步分割..."
                 )
                 raise ValueError(f"块大小为 {len(part)} 字符，超过限制（{MAX_CHUNK_SIZE} 个字符），需要进一步分割...")
+            segments.append((is_special_content, part))
+
+        return segments
 
+    @staticmethod
+    def assemble_text_chunk(segments: List[Tuple[bool, str]], translate: Callable[[str], str]) -> str:
+        translated_parts = []
+        for is_special_content, part in segments:
+            if is_special_content:
+                # 特殊内容原样保留
+                translated_parts.append(f"\n{part}\n")
+            else:
+                translated_parts.append(translate(part))
         return "".join(translated_parts)
 
     @staticmethod
+    @traced("split_by_special_content", cat="parse")
     def split_by_special_content(markdown_content: str) -> List[str]:
         if not markdown_content.strip():
             return []
@@ -134,11 +250,87 @@ class TranslateAgent:
         # 过滤掉空字符串
         return [part for part in parts if part]
 
-    def translate(self, content: str) -> str:
+    def estimate_usage(self, chunks: List[str], targets: List[str]) -> dict:
+        """Roughly estimate the calls, tokens and cost of translating `chunks` into `targets`."""
+        chunk_tokens = sum(estimate_tokens(chunk) for chunk in chunks)
+        prompt_tokens = sum(estimate_tokens(build_system_prompt(target)) for target in targets)
+        input_tokens = prompt_tokens * len(chunks) + chunk_tokens * len(targets)
+        output_tokens = chunk_tokens * len(targets) * OUTPUT_TOKENS_RATIO
+        currency, input_price, output_price = PRICING[self.provider]
+        return {
+            "calls": len(chunks) * len(targets),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": (input_tokens * input_price + output_tokens * output_price) / 1_000_000,
+            "currency": currency,
+        }
+
+    def report_dry_run(
+        self, segmented_sections: List[List[Tuple[bool, str]]], chunks: List[str], targets: List[str]
+    ) -> dict:
+        usage = self.estimate_usage(chunks, targets)
+        special_parts = sum(1 for parts in segmented_sections for is_special, _ in parts if is_special)
+        print(
+            f"✅ [dry-run] {len(segmented_sections)} 个部分，{len(chunks)} 个待翻译文本块（去重后），"
+            f"{special_parts} 个特殊内容块原样保留"
+        )
+        print(
+            f"✅ [dry-run] 目标语言: {', '.join(targets)}，共 {usage['calls']} 次翻译调用，"
+            f"预计输入 {usage['input_tokens']} Token，输出 {usage['output_tokens']} Token"
+        )
+        print(f"✅ [dry-run] 预计费用（{self.provider}）: {usage['cost']:.4f} {usage['currency']}")
+        return usage
+
+    def translate_many(self, chunks: List[str], targets: List[str]) -> dict[Tuple[str, str], str]:
+        """Translate every chunk into every target language concurrently.
+
+        Returns:
+            The translation keyed by (target, chunk)
+        """
+        tasks = [(target, chunk) for chunk in chunks for target in targets]
+        if not tasks:
+            return {}
+        print(f"✅ 共 {len(chunks)} 个待翻译文本块 × {len(targets)} 个目标语言，开始并发翻译...")
+
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            with span("translate_many", chunks=len(chunks), targets=",".join(targets), workers=self.max_workers):
+                # 每个任务复制一份上下文，让作业截止时间传递到工作线程
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run, self._translate_task, chunk, target, trace_now_us()
+                    ): (target, chunk)
+                    for target, chunk in tasks
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    target, chunk = futures[future]
+                    results[(target, chunk)] = future.result()
+                    print(f"✅ [{done}/{len(tasks)}] {target} 翻译完成")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def _translate_task(self, content: str, target: str, submitted_at: float | None) -> str:
+        if submitted_at is not None:
+            record_span("queue_wait", "scheduler", submitted_at, target=target)
+        return self.translate(content, target)
+
+    def translate(self, content: str, target: str = DEFAULT_TARGET) -> str:
         if not content.strip():
             return ""
         st = time.time()
-        result = translate_by_deepseek(content)
+        with span("translate", target=target, chars=len(content)):
+            try:
+                with deadline_scope(self.call_timeout):
+                    result = get_backend(self.provider)(content, target)
+            except (CircuitOpenError, DeadlineExceededError) as e:
+                # 主后端不可用或剩余时间不足以再次重试，立即切换到备用后端（如有）
+                if not self.fallback_provider or self.fallback_provider == self.provider:
+                    raise
+                print(f"⚠️ {self.provider} 快速失败: {e}，切换到 {self.fallback_provider}")
+                with deadline_scope(self.call_timeout):
+                    result = get_backend(self.fallback_provider)(content, target)
         print(f"✅ 翻译耗时: {time.time() - st:.2f} 秒")
         return result
 
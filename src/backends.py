@@ -0,0 +1,38 @@
+import importlib
+import threading
+
+from tracing import span
+
+# 后端名称 -> 实现模块；模块（以及它依赖的 SDK）只在首次使用该后端时才导入
+BACKENDS = {
+    "deepseek": "translate_by_deepseek",
+    "gemini": "translate_by_gemini",
+}
+
+# 用于 --dry-run 估算费用的单价：(币种, 输入每百万 Token, 输出每百万 Token)
+PRICING = {
+    "deepseek": ("CNY", 4.0, 16.0),
+    "gemini": ("USD", 0.0375, 0.15),
+}
+
+_loaded_backends = {}
+_loaded_backends_lock = threading.Lock()
+
+
+def get_backend(name: str):
+    """Import the backend module on first use and return its translate function.
+
+    Args:
+        name: The backend name, one of BACKENDS
+
+    Returns:
+        The backend's generate_in_non_stream_mode(text, target) function
+    """
+    with _loaded_backends_lock:
+        backend = _loaded_backends.get(name)
+        if backend is None:
+            with span("import_backend", cat="startup", provider=name):
+                module = importlib.import_module(BACKENDS[name])
+            backend = module.generate_in_non_stream_mode
+            _loaded_backends[name] = backend
+        return backend
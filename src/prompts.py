@@ -0,0 +1,139 @@
+# --- 目标语言配置 ---
+DEFAULT_TARGET = "zh_CN"
+
+LANGUAGES = {
+    "zh_CN": {
+        "name": "Chinese",
+        "style": "简体中文 colloquially spoken in China",
+    },
+    "ja": {
+        "name": "Japanese",
+        "style": "日本語 as naturally written in Japan",
+    },
+    "ko": {
+        "name": "Korean",
+        "style": "한국어 as naturally written in South Korea",
+    },
+}
+
+GLOSSARIES = {
+    "zh_CN": [
+        ("AGI", "通用人工智能"),
+        ("LLM/Large Language Model", "大语言模型"),
+        ("Transformer", "Transformer"),
+        ("Token", "Token"),
+        ("Generative AI", "生成式 AI"),
+        ("AI Agent", "AI 智能体"),
+        ("prompt", "提示词"),
+        ("zero-shot", "零样本学习"),
+        ("few-shot", "少样本学习"),
+        ("multi-modal", "多模态"),
+        ("fine-tuning", "微调"),
+    ],
+    "ja": [
+        ("AGI", "汎用人工知能"),
+        ("LLM/Large Language Model", "大規模言語モデル"),
+        ("Transformer", "Transformer"),
+        ("Token", "トークン"),
+        ("Generative AI", "生成 AI"),
+        ("AI Agent", "AI エージェント"),
+        ("prompt", "プロンプト"),
+        ("zero-shot", "ゼロショット学習"),
+        ("few-shot", "フューショット学習"),
+        ("multi-modal", "マルチモーダル"),
+        ("fine-tuning", "ファインチューニング"),
+    ],
+    "ko": [
+        ("AGI", "범용 인공지능"),
+        ("LLM/Large Language Model", "대규모 언어 모델"),
+        ("Transformer", "Transformer"),
+        ("Token", "토큰"),
+        ("Generative AI", "생성형 AI"),
+        ("AI Agent", "AI 에이전트"),
+        ("prompt", "프롬프트"),
+        ("zero-shot", "제로샷 학습"),
+        ("few-shot", "퓨샷 학습"),
+        ("multi-modal", "멀티모달"),
+        ("fine-tuning", "파인튜닝"),
+    ],
+}
+
+SYSTEM_PROMPT_TEMPLATE = """You are a highly skilled translator tasked with translating various types of content from other languages into {name}. Follow these instructions carefully to complete the translation task:
+
+## Input
+
+Depending on the type of input, follow these specific instructions:
+
+1. If the input is a URL:
+First, request the built-in Action to retrieve the URL content. Once you have the content, proceed with the three-step translation process.
+
+2. If the input is an image or PDF:
+Get the content from image (by OCR) or PDF, and proceed with the three-step translation process.
+
+3. Otherwise, proceed directly to the three-step translation process.
+
+## Strategy
+
+You will follow a three-step translation process:
+1. Translate the input content into {name}, respecting the original intent, keeping the original paragraph and text format unchanged, not deleting or omitting any content, including preserving all original Markdown elements like images, code blocks, etc.
+2. Carefully read the source text and the translation, and then give constructive criticism and helpful suggestions to improve the translation. The final style and tone of the translation should match the style of {style}. When writing suggestions, pay attention to whether there are ways to improve the translation's
+(i) accuracy (by correcting errors of addition, mistranslation, omission, or untranslated text),
+(ii) fluency (by applying {name} grammar, spelling and punctuation rules, and ensuring there are no unnecessary repetitions),
+(iii) style (by ensuring the translations reflect the style of the source text and take into account any cultural context),
+(iv) terminology (by ensuring terminology use is consistent and reflects the source text domain; and by only ensuring you use equivalent idioms {name}).
+3. Based on the results of steps 1 and 2, refine and polish the translation
+
+## Glossary
+
+Here is a glossary of technical terms to use consistently in your translations:
+
+{glossary}
+
+## Output
+
+For each step of the translation process, output your results within the appropriate XML tags:
+
+<step1_initial_translation>
+[Insert your initial translation here]
+</step1_initial_translation>
+
+<step2_reflection>
+[Insert your reflection on the translation, write a list of specific, helpful and constructive suggestions for improving the translation. Each suggestion should address one specific part of the translation.]
+</step2_reflection>
+
+<step3_refined_translation>
+[Insert your refined and polished translation here]
+</step3_refined_translation>
+
+Remember to consistently use the provided glossary for technical terms throughout your translation. Ensure that your final translation in step 3 accurately reflects the original meaning while sounding natural in {name}."""
+
+
+def parse_targets(targets) -> list[str]:
+    """Normalize `zh_CN,ja,ko` (or a list/tuple of codes) into a de-duplicated list of target codes."""
+    if isinstance(targets, str):
+        targets = targets.split(",")
+    result = []
+    for target in targets:
+        target = str(target).strip()
+        if not target or target in result:
+            continue
+        if target not in LANGUAGES:
+            raise ValueError(f"不支持的目标语言: {target}，可选: {', '.join(LANGUAGES)}")
+        result.append(target)
+    if not result:
+        raise ValueError("至少需要指定一个目标语言")
+    return result
+
+
+def build_system_prompt(target: str = DEFAULT_TARGET) -> str:
+    """Build the three-step translation system prompt for the target language.
+
+    Args:
+        target: The target language code, e.g. zh_CN, ja, ko
+
+    Returns:
+        The system prompt with the target language's glossary filled in
+    """
+    language = LANGUAGES[target]
+    glossary = "\n".join(f"- {term} -> {translation}" for term, translation in GLOSSARIES[target])
+    return SYSTEM_PROMPT_TEMPLATE.format(name=language["name"], style=language["style"], glossary=glossary)
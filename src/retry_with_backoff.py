@@ -1,6 +1,12 @@
+import contextlib
+import contextvars
 import functools
 import random
+import threading
 import time
+from typing import Dict
+
+from tracing import span
 
 
 class MaximumNumberOfRetriesExceededError(Exception):
@@ -9,6 +15,186 @@ class MaximumNumberOfRetriesExceededError(Exception):
         self.errors = errors
 
 
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the provider's circuit breaker is open."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the remaining time budget cannot cover another attempt."""
+
+
+class CircuitBreaker:
+    """A thread-safe closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and rejects calls
+    for `recovery_timeout` seconds. It then lets a single probe call through (half-open):
+    a success closes the breaker, a failure opens it again. While half-open, only the
+    probe's own outcome changes the state; late results from other calls are ignored.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        # 熔断器打开时通知所有正在退避等待的调用
+        self._opened = threading.Condition(self._lock)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # 半开状态下探测请求所在线程的 ident，None 表示没有在途探测
+        self._probe_owner = None
+
+    def _is_open(self) -> bool:
+        return self._state == self.OPEN and time.monotonic() - self._opened_at < self.recovery_timeout
+
+    def _is_probe(self) -> bool:
+        return self._probe_owner == threading.get_ident()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and not self._is_open():
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._is_open():
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_owner = None
+            # Half-open: only one probe call at a time
+            if self._probe_owner is not None:
+                return False
+            self._probe_owner = threading.get_ident()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN and not self._is_probe():
+                return
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_owner = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            # 已打开时只计数，半开时只认探测请求的结果，避免在途调用的迟到失败推迟恢复窗口
+            if self._state == self.OPEN or (self._state == self.HALF_OPEN and not self._is_probe()):
+                return
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                print(f"circuit breaker [{self.name}]: open after {self._failures} failure(s).")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_owner = None
+                self._opened.notify_all()
+
+    def release(self) -> None:
+        """Release a half-open probe slot without recording an outcome."""
+        with self._lock:
+            if self._is_probe():
+                self._probe_owner = None
+
+    def wait_unless_open(self, timeout: float) -> bool:
+        """Sleep for up to `timeout` seconds, waking early if the breaker opens.
+
+        Returns:
+            True if the full timeout elapsed, False if the breaker is (or became) open
+        """
+        expires_at = time.monotonic() + timeout
+        with self._lock:
+            while not self._is_open():
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    return True
+                self._opened.wait(remaining)
+            return False
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, failure_threshold: int = 5, recovery_timeout: float = 30) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for `name`, creating it on first use."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold=failure_threshold, recovery_timeout=recovery_timeout)
+            _circuit_breakers[name] = breaker
+        return breaker
+
+
+# Absolute time.monotonic() at which the current job/call must finish, or None
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline_scope(timeout: float | None):
+    """Limit everything inside the block to `timeout` seconds.
+
+    Scopes nest: the effective deadline is the earliest of the enclosing ones, so a
+    per-call scope opened inside a per-job scope can never outlive the job.
+    """
+    if timeout is None:
+        yield
+        return
+    expires_at = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Seconds left before the current deadline, or None if there is no deadline."""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
+
+
+def _before_attempt(circuit_breaker: CircuitBreaker | None) -> None:
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError("Deadline exceeded before the call could be attempted.")
+    if circuit_breaker is not None and not circuit_breaker.allow_request():
+        raise CircuitOpenError(f"Circuit breaker [{circuit_breaker.name}] is open.")
+
+
+def _check_circuit_before_backoff(circuit_breaker: CircuitBreaker | None) -> None:
+    if circuit_breaker is not None and circuit_breaker.state == CircuitBreaker.OPEN:
+        raise CircuitOpenError(f"Circuit breaker [{circuit_breaker.name}] is open.")
+
+
+def _backoff_sleep(delay: float, circuit_breaker: CircuitBreaker | None) -> None:
+    if circuit_breaker is None:
+        time.sleep(delay)
+    elif not circuit_breaker.wait_unless_open(delay):
+        raise CircuitOpenError(f"Circuit breaker [{circuit_breaker.name}] is open.")
+
+
+def _check_budget_for_backoff(delay: float) -> None:
+    remaining = remaining_time()
+    if remaining is not None and remaining <= delay:
+        raise DeadlineExceededError(
+            f"Remaining budget ({remaining:.2f} seconds) cannot cover a backoff of {delay:.2f} seconds."
+        )
+
+
 def retry_with_exponential_backoff(
     *,
     initial_delay: float = 1,
@@ -16,10 +202,18 @@ def retry_with_exponential_backoff(
     jitter: bool = True,
     max_retries: int = 2,
     errors: tuple = (Exception,),
+    circuit_breaker: CircuitBreaker | None = None,
 ):
-    """Retry a function with exponential backoff."""
+    """Retry a function with exponential backoff.
+
+    If `circuit_breaker` is given, calls fail fast with CircuitOpenError while it is open.
+    Retries never sleep past the enclosing `deadline_scope`; DeadlineExceededError is
+    raised instead.
+    """
 
     def decorator(func):
+        provider = circuit_breaker.name if circuit_breaker is not None else func.__module__
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             if max_retries > 10:
@@ -29,11 +223,15 @@ def retry_with_exponential_backoff(
             delay = initial_delay
             # Loop until a successful response or max_retries is hit or an exception is raised
             while 1:
+                _before_attempt(circuit_breaker)
                 try:
-                    return func(*args, **kwargs)
+                    with span("backend_call", cat="backend", provider=provider, attempt=num_retries + 1):
+                        result = func(*args, **kwargs)
                 # Retry on specified errors
                 except errors as exc:
                     print(f"caught error: {exc}, num_retries: {num_retries}.")
+                    if circuit_breaker is not None:
+                        circuit_breaker.record_failure()
                     # Increment retries
                     num_retries += 1
                     # Check if max retries has been reached
@@ -43,12 +241,21 @@ def retry_with_exponential_backoff(
                         )
                     # Compute the delay
                     delay = initial_delay * (exponential_base**num_retries) * (1 + jitter * random.random())
+                    _check_circuit_before_backoff(circuit_breaker)
+                    _check_budget_for_backoff(delay)
                     # Sleep for the delay
                     print(f"create (backoff): sleeping for {delay} seconds.")
-                    time.sleep(delay)
+                    with span("backoff_sleep", cat="retry", provider=provider, attempt=num_retries, delay=delay):
+                        _backoff_sleep(delay, circuit_breaker)
                 # Raise exceptions for any errors not specified
                 except Exception as exc:
+                    if circuit_breaker is not None:
+                        circuit_breaker.release()
                     raise exc
+                else:
+                    if circuit_breaker is not None:
+                        circuit_breaker.record_success()
+                    return result
 
         return wrapper
 
@@ -61,10 +268,16 @@ def retry_with_constant_backoff(
     jitter: bool = True,
     max_retries: int = 2,
     errors: tuple = (Exception,),
+    circuit_breaker: CircuitBreaker | None = None,
 ):
-    """Retry a function with constant backoff."""
+    """Retry a function with constant backoff.
+
+    Honours `circuit_breaker` and `deadline_scope` like retry_with_exponential_backoff.
+    """
 
     def decorator(func):
+        provider = circuit_breaker.name if circuit_breaker is not None else func.__module__
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             if max_retries > 10:
@@ -73,11 +286,15 @@ def retry_with_constant_backoff(
             num_retries = 0
             # Loop until a successful response or max_retries is hit or an exception is raised
             while 1:
+                _before_attempt(circuit_breaker)
                 try:
-                    return func(*args, **kwargs)
+                    with span("backend_call", cat="backend", provider=provider, attempt=num_retries + 1):
+                        result = func(*args, **kwargs)
                 # Retry on specified errors
                 except errors as exc:
                     print(f"caught error: {exc}, num_retries: {num_retries}.")
+                    if circuit_breaker is not None:
+                        circuit_breaker.record_failure()
                     # Increment retries
                     num_retries += 1
                     # Check if max retries has been reached
@@ -87,12 +304,21 @@ def retry_with_constant_backoff(
                         )
                     # Compute the delay
                     delay = constant_delay * (1 + jitter * random.random())
+                    _check_circuit_before_backoff(circuit_breaker)
+                    _check_budget_for_backoff(delay)
                     # Sleep for the delay
                     print(f"create (backoff): sleeping for {delay} seconds.")
-                    time.sleep(delay)
+                    with span("backoff_sleep", cat="retry", provider=provider, attempt=num_retries, delay=delay):
+                        _backoff_sleep(delay, circuit_breaker)
                 # Raise exceptions for any errors not specified
                 except Exception as exc:
+                    if circuit_breaker is not None:
+                        circuit_breaker.release()
                     raise exc
+                else:
+                    if circuit_breaker is not None:
+                        circuit_breaker.record_success()
+                    return result
 
         return wrapper
 
@@ -0,0 +1,164 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+# 当前生效的 Tracer，未开启追踪时为 None，此时所有埋点都走空操作分支
+_tracer = None
+
+
+class Tracer:
+    """Collect spans and write them in Chrome trace-event format (openable in Perfetto)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._thread_names = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    def add_complete_event(self, name: str, cat: str, ts: float, dur: float, args: dict) -> None:
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": dur,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                for tid, name in self._thread_names.items()
+            ]
+            return {"traceEvents": metadata + list(self._events), "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+
+class Span:
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: dict):
+        self._tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self._token = None
+        self._start = 0.0
+
+    def set(self, **kwargs) -> None:
+        self.args.update(kwargs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._start = self._tracer.now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = self._tracer.now_us()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self._tracer.add_complete_event(self.name, self.cat, self._start, end - self._start, self.args)
+        return False
+
+
+class _NullSpan:
+    def set(self, **kwargs) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, cat: str = "agent", **args):
+    """Record the enclosed block as a span; a shared no-op object is returned when tracing is off."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, cat, args)
+
+
+def annotate(**kwargs) -> None:
+    """Attach extra args (e.g. token usage) to the innermost open span."""
+    if _tracer is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.set(**kwargs)
+
+
+def record_span(name: str, cat: str, start_us: float, **args) -> None:
+    """Record a span that started at `start_us` (from now_us()) and ends now, e.g. queue wait time."""
+    if _tracer is None:
+        return
+    _tracer.add_complete_event(name, cat, start_us, _tracer.now_us() - start_us, args)
+
+
+def now_us() -> float | None:
+    """Current trace timestamp in microseconds, or None when tracing is off."""
+    if _tracer is None:
+        return None
+    return _tracer.now_us()
+
+
+def traced(name: str | None = None, cat: str = "agent"):
+    """Decorate a function so every call is recorded as a span."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, span_name, cat, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def tracing(path: str | None):
+    """Enable tracing inside the block and write the trace to `path` on exit; a no-op when `path` is None."""
+    global _tracer
+    if not path:
+        yield None
+        return
+    tracer = Tracer()
+    previous, _tracer = _tracer, tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = previous
+        try:
+            tracer.write(path)
+            print(f"✅ 追踪数据已保存至: {path}（可在 https://ui.perfetto.dev 打开）")
+        except OSError as e:
+            print(f"❌ 错误: 无法写入追踪文件 at {path}. Error: {e}")
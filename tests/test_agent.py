@@ -1,5 +1,6 @@
 import pytest
 
+import agent as agent_module
 from agent import TranslateAgent
 
 
@@ -171,3 +172,91 @@ def test_multiple_special_content(agent):
     assert result[2] == "和[链接2](url2)和"
     assert result[3] == "![图片2](img2)"
     assert result[4] == "\n结束"
+
+
+def test_resolve_output_paths_default():
+    """默认按目标语言生成输出文件名"""
+    result = TranslateAgent.resolve_output_paths("doc.md", None, ["zh_CN", "ja"])
+    assert result == {"zh_CN": "doc_zh_CN.md", "ja": "doc_ja.md"}
+
+
+def test_resolve_output_paths_placeholder():
+    """output_path 中的 {target} 占位符"""
+    result = TranslateAgent.resolve_output_paths("doc.md", "out/doc.{target}.md", ["zh_CN", "ko"])
+    assert result == {"zh_CN": "out/doc.zh_CN.md", "ko": "out/doc.ko.md"}
+
+
+def test_resolve_output_paths_conflict():
+    """多个目标语言不能共用同一个输出文件"""
+    assert TranslateAgent.resolve_output_paths("doc.md", "out.md", ["zh_CN", "ja"]) is None
+    assert TranslateAgent.resolve_output_paths("doc.md", "out.md", ["ja"]) == {"ja": "out.md"}
+    assert TranslateAgent.resolve_output_paths("doc.md", "doc.md", ["ja"]) is None
+
+
+def test_resolve_output_paths_non_md_input():
+    """非 .md 输入按文件名追加语言后缀，不会覆盖输入文件"""
+    result = TranslateAgent.resolve_output_paths("notes.markdown", None, ["zh_CN", "ja"])
+    assert result == {"zh_CN": "notes_zh_CN.markdown", "ja": "notes_ja.markdown"}
+    result = TranslateAgent.resolve_output_paths("my.md.d/doc.md", None, ["ja"])
+    assert result == {"ja": "my.md.d/doc_ja.md"}
+
+
+def test_run_unknown_target(tmp_path, capsys):
+    """不支持的目标语言打印错误并保留输入文件"""
+    source = tmp_path / "doc.md"
+    source.write_text("# Title\n", encoding="utf-8")
+    TranslateAgent().run(str(source), targets="xx")
+    assert "❌ 错误: 不支持的目标语言: xx" in capsys.readouterr().out
+    assert source.exists()
+
+
+def test_run_multiple_targets(tmp_path, monkeypatch):
+    """一次切分，按 文本块 × 目标语言 去重翻译并分别输出"""
+    calls = []
+
+    def fake_backend(text, target):
+        calls.append((target, text))
+        return f"[{target}]{text.strip()}"
+
+    monkeypatch.setattr(agent_module, "get_backend", lambda name: fake_backend)
+    source = tmp_path / "doc.md"
+    source.write_text("# Note\nSame text\n```python\nprint(1)\n```\n# Note\nSame text\n", encoding="utf-8")
+
+    TranslateAgent().run(str(source), keep_original=True, targets="zh_CN,ja")
+
+    # 重复的文本块每个目标语言只翻译一次
+    assert sorted(calls) == [("ja", "# Note\nSame text\n"), ("zh_CN", "# Note\nSame text\n")]
+    assert (tmp_path / "doc_zh_CN.md").read_text(encoding="utf-8") == (
+        "[zh_CN]# Note\nSame text\n```python\nprint(1)\n```\n\n[zh_CN]# Note\nSame text"
+    )
+    assert (tmp_path / "doc_ja.md").read_text(encoding="utf-8").startswith("[ja]# Note")
+    assert source.exists()
+
+
+def test_run_dry_run(tmp_path, monkeypatch, capsys):
+    """dry-run 只估算，不调用后端也不写入输出文件"""
+
+    def fail_backend(name):
+        raise AssertionError("dry-run 不应加载翻译后端")
+
+    monkeypatch.setattr(agent_module, "get_backend", fail_backend)
+    source = tmp_path / "doc.md"
+    source.write_text("# Title\nSome text\n```python\nprint(1)\n```\n# Title\nSome text\n", encoding="utf-8")
+
+    TranslateAgent().run(str(source), targets="zh_CN,ja", dry_run=True)
+
+    assert source.exists()
+    assert not (tmp_path / "doc_zh_CN.md").exists()
+    out = capsys.readouterr().out
+    assert "1 个待翻译文本块" in out
+    assert "共 2 次翻译调用" in out
+
+
+def test_estimate_usage(agent):
+    """按字符数估算 Token 与费用"""
+    usage = agent.estimate_usage(["a" * 400], ["zh_CN", "ja"])
+    assert usage["calls"] == 2
+    assert usage["output_tokens"] == 100 * 2 * agent_module.OUTPUT_TOKENS_RATIO
+    assert usage["input_tokens"] > 200
+    assert usage["currency"] == "CNY"
+    assert usage["cost"] > 0
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+SDK_MODULES = ("openai", "google.genai")
+
+
+def _imported_modules(code: str) -> set:
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_import_agent_does_not_load_sdks():
+    """导入 agent 时不应导入任何翻译后端 SDK"""
+    modules = _imported_modules("import agent")
+    for sdk in SDK_MODULES:
+        assert sdk not in modules
+
+
+def test_dry_run_does_not_load_sdks(tmp_path):
+    """dry-run 全程不导入翻译后端 SDK"""
+    source = tmp_path / "doc.md"
+    source.write_text("# Title\nSome text\n", encoding="utf-8")
+    modules = _imported_modules(f"import agent\nagent.TranslateAgent().run({str(source)!r}, dry_run=True)")
+    for sdk in SDK_MODULES:
+        assert sdk not in modules
+
+
+def test_get_backend_loads_lazily():
+    """首次使用后端时才导入对应模块"""
+    modules = _imported_modules("import backends\nbackends.get_backend('deepseek')")
+    assert "openai" in modules
+    assert "google.genai" not in modules
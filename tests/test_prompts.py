@@ -0,0 +1,28 @@
+import pytest
+
+from prompts import build_system_prompt, parse_targets
+
+
+def test_parse_targets():
+    """解析逗号分隔的目标语言并去重"""
+    assert parse_targets("zh_CN,ja, ko,ja") == ["zh_CN", "ja", "ko"]
+    assert parse_targets(("zh_CN", "ko")) == ["zh_CN", "ko"]
+
+
+def test_parse_targets_unknown():
+    """不支持的目标语言"""
+    with pytest.raises(ValueError):
+        parse_targets("zh_CN,xx")
+    with pytest.raises(ValueError):
+        parse_targets("")
+
+
+def test_build_system_prompt_uses_target_glossary():
+    """系统提示词使用目标语言及其术语表"""
+    zh_prompt = build_system_prompt("zh_CN")
+    assert "into Chinese" in zh_prompt
+    assert "- AI Agent -> AI 智能体" in zh_prompt
+    ja_prompt = build_system_prompt("ja")
+    assert "into Japanese" in ja_prompt
+    assert "- LLM/Large Language Model -> 大規模言語モデル" in ja_prompt
+    assert "智能体" not in ja_prompt
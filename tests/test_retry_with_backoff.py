@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from retry_with_backoff import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    MaximumNumberOfRetriesExceededError,
+    deadline_scope,
+    remaining_time,
+    retry_with_exponential_backoff,
+)
+
+
+class FlakyError(Exception):
+    pass
+
+
+def test_circuit_breaker_opens_after_threshold():
+    """连续失败达到阈值后熔断器打开"""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_circuit_breaker_half_open_probe():
+    """恢复期过后只放行一个探测请求，成功则关闭"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_half_open_failure_reopens():
+    """探测请求失败后熔断器重新打开"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_retry_fails_fast_when_circuit_open():
+    """熔断器打开时不再调用函数也不再等待"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+    calls = []
+
+    @retry_with_exponential_backoff(
+        initial_delay=5, jitter=False, max_retries=3, errors=(FlakyError,), circuit_breaker=breaker
+    )
+    def call():
+        calls.append(1)
+        raise FlakyError("down")
+
+    st = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert time.monotonic() - st < 1
+    assert len(calls) == 1
+    with pytest.raises(CircuitOpenError):
+        call()
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_ignores_failures_while_open():
+    """已打开时的迟到失败不会推迟恢复窗口"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.03)
+    breaker.record_failure()
+    time.sleep(0.03)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_circuit_breaker_half_open_ignores_late_failure():
+    """半开状态下非探测请求的迟到失败不改变状态"""
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow_request()
+
+    late = threading.Thread(target=breaker.record_failure)
+    late.start()
+    late.join()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_wakes_backoff_when_circuit_opens():
+    """其他调用打开熔断器时，正在退避等待的调用立即失败"""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    result = {}
+
+    @retry_with_exponential_backoff(
+        initial_delay=5, jitter=False, max_retries=3, errors=(FlakyError,), circuit_breaker=breaker
+    )
+    def call():
+        raise FlakyError("down")
+
+    def worker():
+        try:
+            call()
+        except CircuitOpenError as e:
+            result["error"] = e
+
+    st = time.monotonic()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.1)
+    breaker.record_failure()
+    thread.join(timeout=2)
+    assert isinstance(result.get("error"), CircuitOpenError)
+    assert time.monotonic() - st < 1
+
+
+def test_retry_records_success():
+    """成功调用会重置熔断器"""
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    attempts = []
+
+    @retry_with_exponential_backoff(initial_delay=0, max_retries=3, errors=(FlakyError,), circuit_breaker=breaker)
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FlakyError("blip")
+        return "ok"
+
+    assert call() == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_max_retries_exceeded():
+    """超过最大重试次数"""
+
+    @retry_with_exponential_backoff(initial_delay=0, max_retries=1, errors=(FlakyError,))
+    def call():
+        raise FlakyError("down")
+
+    with pytest.raises(MaximumNumberOfRetriesExceededError):
+        call()
+
+
+def test_retry_does_not_sleep_past_deadline():
+    """剩余时间不足以覆盖退避时间时立即失败"""
+
+    @retry_with_exponential_backoff(initial_delay=10, max_retries=3, jitter=False, errors=(FlakyError,))
+    def call():
+        raise FlakyError("down")
+
+    st = time.monotonic()
+    with deadline_scope(1), pytest.raises(DeadlineExceededError):
+        call()
+    assert time.monotonic() - st < 1
+
+
+def test_retry_rejects_expired_deadline():
+    """截止时间已过时不再尝试调用"""
+    calls = []
+
+    @retry_with_exponential_backoff(initial_delay=0, errors=(FlakyError,))
+    def call():
+        calls.append(1)
+
+    with deadline_scope(0), pytest.raises(DeadlineExceededError):
+        call()
+    assert calls == []
+
+
+def test_deadline_scope_nesting():
+    """内层截止时间不能晚于外层"""
+    assert remaining_time() is None
+    with deadline_scope(1):
+        with deadline_scope(100):
+            assert remaining_time() <= 1
+        with deadline_scope(0.5):
+            assert remaining_time() <= 0.5
+    assert remaining_time() is None
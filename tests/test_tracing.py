@@ -0,0 +1,86 @@
+import json
+
+import agent as agent_module
+import tracing
+from agent import TranslateAgent
+from retry_with_backoff import CircuitBreaker, retry_with_exponential_backoff
+
+
+class FlakyError(Exception):
+    pass
+
+
+def test_span_is_noop_when_tracing_off():
+    """未开启追踪时返回共享的空操作对象"""
+    assert not tracing.is_tracing()
+    assert tracing.span("a") is tracing.span("b")
+    assert tracing.now_us() is None
+    with tracing.span("noop") as s:
+        s.set(foo=1)
+    tracing.annotate(foo=1)
+
+
+def test_tracing_writes_chrome_trace(tmp_path):
+    """追踪文件为 Chrome trace-event 格式，并记录嵌套 span 的参数"""
+    path = tmp_path / "trace.json"
+    with tracing.tracing(str(path)):
+        with tracing.span("outer", cat="test", foo=1):
+            with tracing.span("inner"):
+                tracing.annotate(tokens=42)
+    assert not tracing.is_tracing()
+
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    events = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    assert events["outer"]["cat"] == "test"
+    assert events["outer"]["args"] == {"foo": 1}
+    assert events["inner"]["args"] == {"tokens": 42}
+    assert events["outer"]["ts"] <= events["inner"]["ts"]
+    assert events["inner"]["dur"] <= events["outer"]["dur"]
+    assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in trace["traceEvents"])
+
+
+def test_tracing_records_attempts_and_backoff(tmp_path):
+    """重试层记录每次调用的尝试次数和退避等待"""
+    attempts = []
+
+    @retry_with_exponential_backoff(
+        initial_delay=0, max_retries=2, errors=(FlakyError,), circuit_breaker=CircuitBreaker("fake")
+    )
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FlakyError("blip")
+        tracing.annotate(prompt_tokens=10)
+        return "ok"
+
+    path = tmp_path / "trace.json"
+    with tracing.tracing(str(path)):
+        assert call() == "ok"
+
+    events = [e for e in json.loads(path.read_text(encoding="utf-8"))["traceEvents"] if e["ph"] == "X"]
+    calls = [e for e in events if e["name"] == "backend_call"]
+    assert [e["args"]["attempt"] for e in calls] == [1, 2]
+    assert calls[0]["args"]["error"] == "FlakyError"
+    assert calls[1]["args"] == {"provider": "fake", "attempt": 2, "prompt_tokens": 10}
+    assert [e["name"] for e in events].count("backoff_sleep") == 1
+
+
+def test_run_with_trace(tmp_path, monkeypatch):
+    """--trace 记录文件读取、切分、翻译与写入"""
+    monkeypatch.setattr(agent_module, "get_backend", lambda name: lambda text, target: text)
+    source = tmp_path / "doc.md"
+    source.write_text("# Title\nSome text\n![img](a.png)\n", encoding="utf-8")
+    path = tmp_path / "trace.json"
+
+    TranslateAgent().run(str(source), keep_original=True, trace=str(path))
+
+    names = {e["name"] for e in json.loads(path.read_text(encoding="utf-8"))["traceEvents"] if e["ph"] == "X"}
+    assert {
+        "read_file",
+        "split_into_sections_by_headings",
+        "split_by_special_content",
+        "translate_many",
+        "queue_wait",
+        "translate",
+        "write_output",
+    } <= names